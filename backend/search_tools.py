@@ -1,8 +1,16 @@
 from typing import Dict, Any, Optional, Protocol
 from abc import ABC, abstractmethod
+from urllib.parse import urljoin
 from vector_store import VectorStore, SearchResults
 import requests
 import json
+import re
+
+# Pattern to match HTML links: <a href="..." target="_blank">link text</a>
+_SOURCE_RE = re.compile(r'<a\s+href="([^"]+)"[^>]*>([^<]+)</a>')
+
+# Marker that starts the "Cited Sources:" section of a nutrition API answer
+_CITED_RE = re.compile(r'cited sources:?', re.IGNORECASE)
 
 
 class Tool(ABC):
@@ -203,6 +211,8 @@ class CourseOutlineTool(Tool):
 class NutritionTool(Tool):
     """Tool for answering nutrition, food, and diet-related questions via UCSF API"""
 
+    API_ENDPOINT = "https://dev-unified-api.ucsf.edu/general/versaassistant/api/answer"
+
     def __init__(self, token_manager):
         """
         Initialize NutritionTool with TokenManager for authentication.
@@ -211,7 +221,7 @@ class NutritionTool(Tool):
             token_manager: TokenManager instance for OAuth token retrieval
         """
         self.token_manager = token_manager
-        self.api_endpoint = "https://dev-unified-api.ucsf.edu/general/versaassistant/api/answer"
+        self.api_endpoint = self.API_ENDPOINT
         self.last_sources = []  # Track sources from last query
 
     def get_tool_definition(self) -> Dict[str, Any]:
@@ -246,16 +256,10 @@ class NutritionTool(Tool):
             - cleaned_answer: Answer text with source section removed
             - sources_list: List of dicts with "text" and "url" keys
         """
-        import re
-        from urllib.parse import urljoin
-
         sources = []
 
-        # Pattern to match HTML links: <a href="..." target="_blank">link text</a>
-        link_pattern = r'<a\s+href="([^"]+)"[^>]*>([^<]+)</a>'
-
         # Find all links in the answer
-        matches = re.findall(link_pattern, answer)
+        matches = _SOURCE_RE.findall(answer)
 
         for href, link_text in matches:
             # Convert relative URLs to absolute URLs
@@ -270,13 +274,13 @@ class NutritionTool(Tool):
 
         # Remove the "Cited Sources:" section and all links from the answer
         # Split by "Cited Sources:" and take the first part
-        if "Cited Sources:" in answer or "cited sources:" in answer.lower():
+        if "cited sources:" in answer.lower():
             # Use case-insensitive split
-            answer_parts = re.split(r'cited sources:?', answer, flags=re.IGNORECASE)
+            answer_parts = _CITED_RE.split(answer, maxsplit=1)
             cleaned_answer = answer_parts[0].strip()
         else:
             # If no "Cited Sources" section, just remove all HTML links
-            cleaned_answer = re.sub(link_pattern, '', answer).strip()
+            cleaned_answer = _SOURCE_RE.sub('', answer).strip()
 
         return cleaned_answer, sources
 
@@ -405,12 +409,13 @@ class NutritionTool(Tool):
         except requests.exceptions.Timeout:
             self.last_sources = []
             return "Error: Nutrition API request timed out. Please try again."
-        except requests.exceptions.RequestException as e:
-            self.last_sources = []
-            return f"Error: Failed to connect to nutrition API - {str(e)}"
         except json.JSONDecodeError:
+            # Before RequestException: requests' JSONDecodeError subclasses both
             self.last_sources = []
             return "Error: Invalid response format from nutrition API."
+        except requests.exceptions.RequestException as e:
+            self.last_sources = []
+            return f"Error: Failed to connect to nutrition API - {str(e)}"
         except Exception as e:
             self.last_sources = []
             return f"Error: Unexpected error while querying nutrition API - {str(e)}"
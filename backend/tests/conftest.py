@@ -2,16 +2,24 @@
 Shared pytest fixtures and helpers for RAG system tests
 """
 import pytest
-from unittest.mock import Mock
-import sys
-import os
+from unittest.mock import Mock, MagicMock
 import json
+import requests
+import sys
+from dataclasses import dataclass
 
-# Add backend to path so tests can import modules
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+# Stub the heavy vector store dependencies before any backend module imports them.
+# Every test mocks ChromaDB and the embedding model, so importing the real packages
+# (and sentence-transformers' torch stack) only adds start-up cost to each worker.
+for _module in ("chromadb", "chromadb.config", "sentence_transformers"):
+    sys.modules[_module] = MagicMock()
 
 from models import Course, Lesson, CourseChunk
-from vector_store import SearchResults
+from vector_store import SearchResults, VectorStore
+from ai_generator import AIGenerator
+from session_manager import SessionManager
+from rag_system import RAGSystem
+from token_manager import create_token_manager_from_env
 
 
 # ============================================================================
@@ -52,7 +60,7 @@ def sample_course_chunks():
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_search_results():
     """Create sample search results"""
     return SearchResults(
@@ -69,13 +77,13 @@ def sample_search_results():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def empty_search_results():
     """Create empty search results"""
     return SearchResults(documents=[], metadata=[], distances=[], error=None)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def error_search_results():
     """Create search results with an error"""
     return SearchResults(
@@ -84,27 +92,133 @@ def error_search_results():
     )
 
 
+@pytest.fixture(scope="session")
+def make_search_results():
+    """Factory for successful SearchResults, memoized so identical inputs share one instance"""
+    cache = {}
+
+    def _create(documents, metadata, distance=0.1):
+        key = (tuple(documents), tuple(tuple(sorted(meta.items())) for meta in metadata), distance)
+        if key not in cache:
+            cache[key] = SearchResults(
+                documents=list(documents),
+                metadata=[dict(meta) for meta in metadata],
+                distances=[distance] * len(documents),
+                error=None
+            )
+        return cache[key]
+    return _create
+
+
 # ============================================================================
-# Vector Store Mocks
+# RAG System Component Mocks
 # ============================================================================
 
+@pytest.fixture(scope="session")
+def rag_component_specs():
+    """Attribute names of the components RAGSystem builds, introspected once per session"""
+    return {
+        'vector_store': dir(VectorStore),
+        'ai_generator': dir(AIGenerator),
+        'session_manager': dir(SessionManager),
+    }
+
+
 @pytest.fixture
-def mock_vector_store():
-    """Create a basic mock VectorStore"""
-    mock_store = Mock()
-    mock_store.search.return_value = SearchResults(documents=[], metadata=[], distances=[], error=None)
-    mock_store.get_lesson_link.return_value = "https://example.com/lesson0"
-    mock_store.get_course_outline.return_value = None
-    return mock_store
+def patched_rag_mocks(monkeypatch, rag_component_specs):
+    """Patch the component classes RAGSystem builds with recording constructor mocks.
+
+    Returns a dict keyed by class name ('VectorStore', 'AIGenerator',
+    'SessionManager'). Each value records the arguments RAGSystem passed
+    (``call_args``) and hands back a fresh spec'd instance (``return_value``).
+    """
+    constructors = {}
+    for class_name, key in (
+        ('VectorStore', 'vector_store'),
+        ('AIGenerator', 'ai_generator'),
+        ('SessionManager', 'session_manager'),
+    ):
+        constructors[class_name] = Mock(return_value=Mock(spec=rag_component_specs[key]))
+        monkeypatch.setattr(f'rag_system.{class_name}', constructors[class_name])
+
+    return constructors
+
+
+@pytest.fixture(scope="class")
+def clear_token_manager_cache():
+    """Keep the memoized TokenManager from leaking between tests that build a real RAGSystem"""
+    create_token_manager_from_env.cache_clear()
+    yield
+    create_token_manager_from_env.cache_clear()
+
+
+@pytest.fixture(scope="class")
+def rag_system_class(rag_component_specs, test_config, clear_token_manager_cache):
+    """Build one RAGSystem per test class on top of spec'd component mocks"""
+    with pytest.MonkeyPatch.context() as mp:
+        for class_name, key in (
+            ('VectorStore', 'vector_store'),
+            ('AIGenerator', 'ai_generator'),
+            ('SessionManager', 'session_manager'),
+        ):
+            component = Mock(spec=rag_component_specs[key])
+            mp.setattr(f'rag_system.{class_name}', lambda *args, _component=component, **kwargs: _component)
+        yield RAGSystem(test_config)
 
 
 @pytest.fixture
-def mock_vector_store_with_results(sample_search_results):
-    """Create a mock VectorStore that returns sample results"""
-    mock_store = Mock()
-    mock_store.search.return_value = sample_search_results
-    mock_store.get_lesson_link.return_value = "https://example.com/lesson0"
-    return mock_store
+def rag_system(rag_system_class):
+    """Hand out the class-wide RAGSystem with its sources and component mocks reset.
+
+    The mocked components are reachable as ``rag_system.vector_store``,
+    ``rag_system.ai_generator`` and ``rag_system.session_manager``.
+    """
+    rag = rag_system_class
+    rag.tool_manager.reset_sources()
+    for component in (rag.vector_store, rag.ai_generator, rag.session_manager):
+        component.reset_mock(return_value=True, side_effect=True)
+
+    rag.ai_generator.generate_response.return_value = "AI response"
+    rag.session_manager.get_conversation_history.return_value = None
+    return rag
+
+
+# ============================================================================
+# Vector Store Mocks
+# ============================================================================
+
+def _vector_store_defaults(search_results):
+    """Canonical return values for a mocked VectorStore"""
+    return {
+        "search.return_value": search_results,
+        "get_lesson_link.return_value": "https://example.com/lesson0",
+        "get_course_outline.return_value": None,
+    }
+
+
+@pytest.fixture(scope="class")
+def mock_vector_store(rag_component_specs, empty_search_results):
+    """Create a basic mock VectorStore, shared across a test class"""
+    return Mock(spec=rag_component_specs['vector_store'], **_vector_store_defaults(empty_search_results))
+
+
+@pytest.fixture(scope="class")
+def mock_vector_store_with_results(rag_component_specs, sample_search_results):
+    """Create a mock VectorStore that returns sample results, shared across a test class"""
+    return Mock(spec=rag_component_specs['vector_store'], **_vector_store_defaults(sample_search_results))
+
+
+@pytest.fixture(autouse=True)
+def _reset_vector_store_mocks(request, empty_search_results, sample_search_results):
+    """Restore whichever class-scoped vector store mocks the test uses to their canonical state"""
+    for name, search_results in (
+        ("mock_vector_store", empty_search_results),
+        ("mock_vector_store_with_results", sample_search_results),
+    ):
+        if name in request.fixturenames:
+            vector_store = request.getfixturevalue(name)
+            vector_store.reset_mock(return_value=True, side_effect=True)
+            vector_store.configure_mock(**_vector_store_defaults(search_results))
 
 
 # ============================================================================
@@ -158,13 +272,12 @@ def mock_ai_client_with_tool_call():
 
 
 @pytest.fixture
-def ai_generator_factory(mock_token_manager):
+def ai_generator_factory(fake_token_manager):
     """Factory to create AIGenerator instances with standard test parameters"""
     def _create():
-        from ai_generator import AIGenerator
         return AIGenerator(
             endpoint="https://test.openai.azure.com",
-            token_manager=mock_token_manager,
+            token_manager=fake_token_manager,
             api_version="2024-02-01",
             deployment="gpt-4"
         )
@@ -175,11 +288,9 @@ def ai_generator_factory(mock_token_manager):
 # Configuration Fixtures
 # ============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def test_config():
     """Create a test configuration with correct values"""
-    from dataclasses import dataclass
-
     @dataclass
     class TestConfig:
         AZURE_OPENAI_ENDPOINT: str = "https://test.openai.azure.com"
@@ -196,11 +307,9 @@ def test_config():
     return TestConfig()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def broken_config():
     """Create a configuration with the MAX_RESULTS bug"""
-    from dataclasses import dataclass
-
     @dataclass
     class BrokenConfig:
         AZURE_OPENAI_ENDPOINT: str = "https://test.openai.azure.com"
@@ -242,9 +351,24 @@ def get_messages_from_call(mock_client, call_index=0):
 # Token Manager Mocks
 # ============================================================================
 
+@dataclass(frozen=True)
+class FakeTokenManager:
+    """Immutable TokenManager stand-in that always returns the same token"""
+    token: str = "mock-oauth-token-12345"
+
+    def get_token(self) -> str:
+        return self.token
+
+
+@pytest.fixture(scope="session")
+def fake_token_manager():
+    """Create a call-free TokenManager for tests that only need a token"""
+    return FakeTokenManager()
+
+
 @pytest.fixture
 def mock_token_manager():
-    """Create a mock TokenManager for OAuth authentication"""
+    """Create a mock TokenManager for tests that verify get_token() calls"""
     mock_tm = Mock()
     mock_tm.get_token.return_value = "mock-oauth-token-12345"
     return mock_tm
@@ -261,68 +385,15 @@ def mock_token_manager_failing():
 # ============================================================================
 # Nutrition API Response Mocks
 # ============================================================================
+# Canned responses are read-only, so they are built once per test module.
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def successful_nutrition_response():
     """Mock successful nutrition API response"""
-    mock_response = Mock()
+    mock_response = Mock(spec=requests.Response)
     mock_response.status_code = 200
     mock_response.headers = {"Content-Type": "application/json"}
     mock_response.json.return_value = {
         "answer": "Bananas are a good source of potassium, containing about 422mg per medium banana. They also provide vitamin B6, vitamin C, and dietary fiber."
     }
     return mock_response
-
-
-@pytest.fixture
-def nutrition_response_alternative_format():
-    """Mock nutrition API response with different field name"""
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.headers = {"Content-Type": "application/json"}
-    mock_response.json.return_value = {
-        "response": "Apples are rich in antioxidants and dietary fiber."
-    }
-    return mock_response
-
-
-@pytest.fixture
-def nutrition_response_unknown_format():
-    """Mock nutrition API response with unrecognized format"""
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.headers = {"Content-Type": "application/json"}
-    mock_response.json.return_value = {
-        "data": {
-            "text": "Some nutrition information"
-        }
-    }
-    return mock_response
-
-
-@pytest.fixture
-def nutrition_401_error():
-    """Mock 401 Unauthorized nutrition API response"""
-    import requests
-    mock_response = Mock()
-    mock_response.status_code = 401
-    mock_response.headers = {}
-    mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError("401 Unauthorized")
-    return mock_response
-
-
-@pytest.fixture
-def nutrition_timeout_error():
-    """Mock timeout error for nutrition API"""
-    import requests
-    return requests.exceptions.Timeout("Request timed out")
-
-
-@pytest.fixture
-def nutrition_invalid_json():
-    """Mock nutrition API response with invalid JSON"""
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.headers = {}
-    mock_response.json.side_effect = json.JSONDecodeError("Invalid JSON", "", 0)
-    return mock_response
@@ -1,15 +1,12 @@
 """
 Integration tests for ai_generator.py - AIGenerator and tool calling
 """
+import json
 from unittest.mock import Mock, patch
-import sys
-import os
-
-# Add backend to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from ai_generator import AIGenerator
 from search_tools import ToolManager, CourseSearchTool
+from vector_store import VectorStore
 
 
 def create_mock_response(content, tool_calls=None):
@@ -23,7 +20,6 @@ def create_mock_response(content, tool_calls=None):
 
 def create_mock_tool_call(tool_id, function_name, arguments):
     """Helper to create a mock tool call"""
-    import json
     tool_call = Mock()
     tool_call.id = tool_id
     tool_call.function.name = function_name
@@ -34,11 +30,11 @@ def create_mock_tool_call(tool_id, function_name, arguments):
 class TestAIGeneratorBasics:
     """Basic tests for AIGenerator"""
 
-    def test_initialization(self, mock_token_manager):
+    def test_initialization(self, fake_token_manager):
         """Test AIGenerator can be initialized"""
         generator = AIGenerator(
             endpoint="https://test.openai.azure.com",
-            token_manager=mock_token_manager,
+            token_manager=fake_token_manager,
             api_version="2024-02-01",
             deployment="gpt-4"
         )
@@ -197,7 +193,7 @@ class TestAIGeneratorToolCallingBug:
         mock_client.chat.completions.create.side_effect = [initial_response, final_response]
         mock_azure_client_class.return_value = mock_client
 
-        mock_vector_store = Mock()
+        mock_vector_store = Mock(spec=VectorStore)
         mock_vector_store.search.return_value = empty_search_results
 
         tool_manager = ToolManager()
@@ -9,17 +9,22 @@ These tests verify the end-to-end flow:
 5. Response is returned to the user
 """
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-import sys
-import os
+from unittest.mock import Mock, patch, MagicMock, DEFAULT
 import json
-
-# Add backend to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import requests
 
 from ai_generator import AIGenerator
-from search_tools import ToolManager, NutritionTool
+from search_tools import ToolManager, NutritionTool, CourseSearchTool
 from rag_system import RAGSystem
+from vector_store import VectorStore
+
+
+@pytest.fixture
+def rag_patches():
+    """Patch the RAG system's VectorStore and token factory in one patch.multiple"""
+    with patch.multiple('rag_system', VectorStore=DEFAULT, create_token_manager_from_env=DEFAULT) as mocks:
+        mocks['VectorStore'].return_value = Mock(spec=VectorStore)
+        yield mocks
 
 
 def create_mock_response(content, tool_calls=None):
@@ -46,7 +51,7 @@ class TestAIGeneratorRecognizesNutritionQuestions:
     @patch('ai_generator.AzureOpenAI')
     @patch('requests.post')
     def test_ai_calls_nutrition_tool_for_nutrition_question(
-        self, mock_requests, mock_azure_client_class, mock_token_manager, successful_nutrition_response
+        self, mock_requests, mock_azure_client_class, fake_token_manager, successful_nutrition_response
     ):
         """Test that AI calls NutritionTool when asked a nutrition question"""
         mock_requests.return_value = successful_nutrition_response
@@ -67,14 +72,14 @@ class TestAIGeneratorRecognizesNutritionQuestions:
         # Create AI generator with token manager
         generator = AIGenerator(
             endpoint="https://test.openai.azure.com",
-            token_manager=mock_token_manager,
+            token_manager=fake_token_manager,
             api_version="2024-02-01",
             deployment="gpt-4"
         )
 
         # Create tool manager with nutrition tool
         tool_manager = ToolManager()
-        tool_manager.register_tool(NutritionTool(mock_token_manager))
+        tool_manager.register_tool(NutritionTool(fake_token_manager))
 
         # Execute query
         response = generator.generate_response(
@@ -94,7 +99,7 @@ class TestAIGeneratorRecognizesNutritionQuestions:
         assert "protein" in user_message["content"].lower()
 
     @patch('ai_generator.AzureOpenAI')
-    def test_ai_recognizes_various_nutrition_questions(self, mock_azure_client_class, mock_token_manager):
+    def test_ai_recognizes_various_nutrition_questions(self, mock_azure_client_class, fake_token_manager):
         """Test that AI recognizes different types of nutrition questions"""
         nutrition_questions = [
             "What vitamins are in spinach?",
@@ -119,13 +124,13 @@ class TestAIGeneratorRecognizesNutritionQuestions:
 
             generator = AIGenerator(
                 endpoint="https://test.openai.azure.com",
-                token_manager=mock_token_manager,
+                token_manager=fake_token_manager,
                 api_version="2024-02-01",
                 deployment="gpt-4"
             )
 
             tool_manager = ToolManager()
-            tool_manager.register_tool(NutritionTool(mock_token_manager))
+            tool_manager.register_tool(NutritionTool(fake_token_manager))
 
             with patch('requests.post') as mock_requests:
                 mock_requests.return_value.status_code = 200
@@ -144,21 +149,16 @@ class TestAIGeneratorRecognizesNutritionQuestions:
 class TestRAGSystemNutritionFlow:
     """Test end-to-end nutrition question flow through RAG system"""
 
-    @patch('rag_system.VectorStore')
-    @patch('rag_system.create_token_manager_from_env')
     @patch('ai_generator.AzureOpenAI')
     @patch('requests.post')
     def test_rag_system_handles_nutrition_question(
-        self, mock_requests, mock_azure_class, mock_token_factory, mock_vector_store_class, test_config,
-        mock_token_manager, successful_nutrition_response
+        self, mock_requests, mock_azure_class, rag_patches, test_config,
+        fake_token_manager, successful_nutrition_response
     ):
         """Test full RAG system flow for nutrition question"""
         # Setup mocks
         mock_requests.return_value = successful_nutrition_response
-        mock_token_factory.return_value = mock_token_manager
-
-        mock_vector_store = Mock()
-        mock_vector_store_class.return_value = mock_vector_store
+        rag_patches['create_token_manager_from_env'].return_value = fake_token_manager
 
         mock_client = Mock()
         tool_call = create_mock_tool_call(
@@ -182,12 +182,9 @@ class TestRAGSystemNutritionFlow:
         assert "broccoli" in response.lower() or "vitamin" in response.lower()
         mock_requests.assert_called_once()
 
-    @patch('rag_system.VectorStore')
-    @patch('rag_system.create_token_manager_from_env')
-    def test_nutrition_tool_is_registered_in_rag_system(self, mock_token_factory, mock_vector_store_class, test_config, mock_token_manager):
+    def test_nutrition_tool_is_registered_in_rag_system(self, rag_patches, test_config, fake_token_manager):
         """Test that NutritionTool is properly registered when RAG system initializes"""
-        mock_token_factory.return_value = mock_token_manager
-        mock_vector_store_class.return_value = Mock()
+        rag_patches['create_token_manager_from_env'].return_value = fake_token_manager
 
         rag = RAGSystem(test_config)
 
@@ -200,13 +197,10 @@ class TestRAGSystemNutritionFlow:
         tool_names = {td["function"]["name"] for td in tool_definitions}
         assert "ask_nutrition_expert" in tool_names
 
-    @patch('rag_system.VectorStore')
-    @patch('rag_system.create_token_manager_from_env')
-    def test_nutrition_tool_not_created_without_token_manager(self, mock_token_factory, mock_vector_store_class, test_config):
+    def test_nutrition_tool_not_created_without_token_manager(self, rag_patches, test_config):
         """Test behavior when token manager is not available (None)"""
         # Simulate no OAuth credentials configured
-        mock_token_factory.return_value = None
-        mock_vector_store_class.return_value = Mock()
+        rag_patches['create_token_manager_from_env'].return_value = None
 
         rag = RAGSystem(test_config)
 
@@ -222,18 +216,15 @@ class TestRAGSystemNutritionFlow:
 class TestNutritionToolWithAIGeneratorTokenManager:
     """Test that NutritionTool and AIGenerator share the same token manager"""
 
-    @patch('rag_system.VectorStore')
-    @patch('rag_system.create_token_manager_from_env')
-    def test_same_token_manager_for_ai_and_nutrition(self, mock_token_factory, mock_vector_store_class, test_config, mock_token_manager):
+    def test_same_token_manager_for_ai_and_nutrition(self, rag_patches, test_config, fake_token_manager):
         """Test that both AI and Nutrition tool use the same token manager instance"""
-        mock_token_factory.return_value = mock_token_manager
-        mock_vector_store_class.return_value = Mock()
+        rag_patches['create_token_manager_from_env'].return_value = fake_token_manager
 
         rag = RAGSystem(test_config)
 
-        # Both should have the same token manager
-        assert rag.ai_generator.token_manager == rag.nutrition_tool.token_manager
-        assert rag.ai_generator.token_manager is not None
+        # Both should hold the one instance returned by create_token_manager_from_env
+        assert rag.ai_generator.token_manager is rag.nutrition_tool.token_manager
+        assert rag.ai_generator.token_manager is fake_token_manager
 
 
 class TestNutritionAPIErrorScenarios:
@@ -241,9 +232,8 @@ class TestNutritionAPIErrorScenarios:
 
     @patch('ai_generator.AzureOpenAI')
     @patch('requests.post')
-    def test_nutrition_api_401_error_handling(self, mock_requests, mock_azure_class, mock_token_manager):
+    def test_nutrition_api_401_error_handling(self, mock_requests, mock_azure_class, fake_token_manager):
         """Test handling when nutrition API returns 401 (auth failure)"""
-        import requests
         mock_requests.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("401 Unauthorized")
         mock_requests.return_value.status_code = 401
 
@@ -257,13 +247,13 @@ class TestNutritionAPIErrorScenarios:
 
         generator = AIGenerator(
             endpoint="https://test.openai.azure.com",
-            token_manager=mock_token_manager,
+            token_manager=fake_token_manager,
             api_version="2024-02-01",
             deployment="gpt-4"
         )
 
         tool_manager = ToolManager()
-        tool_manager.register_tool(NutritionTool(mock_token_manager))
+        tool_manager.register_tool(NutritionTool(fake_token_manager))
 
         response = generator.generate_response(
             query="What's in carrots?",
@@ -278,9 +268,8 @@ class TestNutritionAPIErrorScenarios:
 
     @patch('ai_generator.AzureOpenAI')
     @patch('requests.post')
-    def test_nutrition_api_timeout_handling(self, mock_requests, mock_azure_class, mock_token_manager):
+    def test_nutrition_api_timeout_handling(self, mock_requests, mock_azure_class, fake_token_manager):
         """Test handling when nutrition API times out"""
-        import requests
         mock_requests.side_effect = requests.exceptions.Timeout("Timeout")
 
         mock_client = Mock()
@@ -293,13 +282,13 @@ class TestNutritionAPIErrorScenarios:
 
         generator = AIGenerator(
             endpoint="https://test.openai.azure.com",
-            token_manager=mock_token_manager,
+            token_manager=fake_token_manager,
             api_version="2024-02-01",
             deployment="gpt-4"
         )
 
         tool_manager = ToolManager()
-        tool_manager.register_tool(NutritionTool(mock_token_manager))
+        tool_manager.register_tool(NutritionTool(fake_token_manager))
 
         response = generator.generate_response(
             query="Nutrition question",
@@ -316,10 +305,8 @@ class TestNutritionToolNotCalledForNonNutritionQuestions:
     """Test that nutrition tool is NOT called for non-nutrition questions"""
 
     @patch('ai_generator.AzureOpenAI')
-    def test_course_question_does_not_call_nutrition_tool(self, mock_azure_class, mock_token_manager, mock_vector_store):
+    def test_course_question_does_not_call_nutrition_tool(self, mock_azure_class, fake_token_manager, mock_vector_store):
         """Test that asking about course content doesn't trigger nutrition tool"""
-        from search_tools import CourseSearchTool
-
         mock_client = Mock()
         # AI should call course search tool, not nutrition tool
         tool_call = create_mock_tool_call(
@@ -335,14 +322,14 @@ class TestNutritionToolNotCalledForNonNutritionQuestions:
 
         generator = AIGenerator(
             endpoint="https://test.openai.azure.com",
-            token_manager=mock_token_manager,
+            token_manager=fake_token_manager,
             api_version="2024-02-01",
             deployment="gpt-4"
         )
 
         tool_manager = ToolManager()
         tool_manager.register_tool(CourseSearchTool(mock_vector_store))
-        tool_manager.register_tool(NutritionTool(mock_token_manager))
+        tool_manager.register_tool(NutritionTool(fake_token_manager))
 
         with patch('requests.post') as mock_nutrition_api:
             response = generator.generate_response(
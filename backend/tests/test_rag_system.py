@@ -1,62 +1,75 @@
 """
 End-to-end integration tests for rag_system.py
 """
+import inspect
 import pytest
-from unittest.mock import Mock, patch
-import sys
-import os
-
-# Add backend to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from rag_system import RAGSystem
+from vector_store import SearchResults, VectorStore
+
+
+def _recorded_max_results(vector_store_class):
+    """Read the max_results argument RAGSystem passed to the patched VectorStore constructor"""
+    call_args = vector_store_class.call_args
+    return inspect.signature(VectorStore).bind(*call_args.args, **call_args.kwargs).arguments["max_results"]
+
+
+@pytest.fixture(params=[
+    ("test_config", "Anthropic", 2),
+    ("broken_config", "couldn't retrieve", 0),
+], ids=["working_config", "broken_config"])
+def rag_under_config(request, patched_rag_mocks, sample_search_results, clear_token_manager_cache):
+    """Build a RAGSystem whose mocked vector store honours the max_results RAGSystem passed it
+
+    The fake search slices the sample results to the recorded constructor argument,
+    the way VectorStore.search falls back to self.max_results. The mocked AI runs the
+    real search tool on those results. Returns (rag, config, vector_store_class,
+    expected_response_fragment, expected_sources_len).
+    """
+    config_name, expected_fragment, expected_sources_len = request.param
+    config = request.getfixturevalue(config_name)
+    vector_store_class = patched_rag_mocks['VectorStore']
+    patched_rag_mocks['SessionManager'].return_value.get_conversation_history.return_value = None
+
+    def search(query, course_name=None, lesson_number=None, limit=None):
+        search_limit = limit if limit is not None else _recorded_max_results(vector_store_class)
+        return SearchResults(
+            documents=sample_search_results.documents[:search_limit],
+            metadata=sample_search_results.metadata[:search_limit],
+            distances=sample_search_results.distances[:search_limit],
+        )
 
+    vector_store_class.return_value.configure_mock(**{
+        "search.side_effect": search,
+        "get_lesson_link.return_value": "https://example.com/lesson0",
+    })
 
-@pytest.fixture
-def mock_rag_components():
-    """Create mocks for all RAG system components"""
-    with patch('rag_system.VectorStore') as mock_vs, \
-         patch('rag_system.AIGenerator') as mock_ai, \
-         patch('rag_system.SessionManager') as mock_sm:
-
-        # Setup vector store mock
-        mock_vector_store = Mock()
-        mock_vs.return_value = mock_vector_store
-
-        # Setup AI generator mock
-        mock_ai_gen = Mock()
-        mock_ai_gen.generate_response.return_value = "AI response"
-        mock_ai.return_value = mock_ai_gen
+    def generate_response(query, conversation_history=None, tools=None, tool_manager=None):
+        tool_result = tool_manager.execute_tool("search_course_content", query=query)
+        if tool_result.startswith("No relevant content"):
+            return "I couldn't retrieve any relevant information about that topic."
+        return tool_result
 
-        # Setup session manager mock
-        mock_session_mgr = Mock()
-        mock_session_mgr.get_conversation_history.return_value = None
-        mock_sm.return_value = mock_session_mgr
+    patched_rag_mocks['AIGenerator'].return_value.generate_response.side_effect = generate_response
 
-        yield {
-            'vector_store': mock_vector_store,
-            'ai_generator': mock_ai_gen,
-            'session_manager': mock_session_mgr
-        }
+    return RAGSystem(config), config, vector_store_class, expected_fragment, expected_sources_len
 
 
+@pytest.mark.xdist_group("rag_system")
 class TestRAGSystemInitialization:
     """Test RAG system initialization"""
 
-    def test_initialization(self, mock_rag_components, test_config):
+    def test_initialization(self, rag_system, test_config):
         """Test that RAG system initializes all components"""
-        rag = RAGSystem(test_config)
+        assert rag_system.config == test_config
+        assert rag_system.document_processor is not None
+        assert rag_system.tool_manager is not None
+        assert rag_system.search_tool is not None
+        assert rag_system.outline_tool is not None
 
-        assert rag.config == test_config
-        assert rag.document_processor is not None
-        assert rag.tool_manager is not None
-        assert rag.search_tool is not None
-        assert rag.outline_tool is not None
-
-    def test_tools_registered(self, mock_rag_components, test_config):
+    def test_tools_registered(self, rag_system):
         """Test that tools are registered with the tool manager"""
-        rag = RAGSystem(test_config)
-        tool_definitions = rag.tool_manager.get_tool_definitions()
+        tool_definitions = rag_system.tool_manager.get_tool_definitions()
 
         assert len(tool_definitions) >= 2
         tool_names = {td["function"]["name"] for td in tool_definitions}
@@ -64,148 +77,96 @@ class TestRAGSystemInitialization:
         assert "get_course_outline" in tool_names
 
 
+@pytest.mark.xdist_group("rag_system")
 class TestRAGSystemQuery:
     """Test RAG system query flow"""
 
-    def test_query_without_session(self, mock_rag_components, test_config):
-        """Test query without session ID"""
-        rag = RAGSystem(test_config)
-        response, sources = rag.query("What is Anthropic?", session_id=None)
-
-        assert response == "AI response"
-        assert isinstance(sources, list)
-        mock_rag_components['ai_generator'].generate_response.assert_called_once()
-
-    def test_query_with_session(self, mock_rag_components, test_config):
-        """Test query with session ID and conversation history"""
-        mock_rag_components['session_manager'].get_conversation_history.return_value = "Previous history"
+    @pytest.mark.parametrize("session_id,history,expected_history_calls,expected_add_exchange", [
+        (None, None, 0, 0),
+        ("session123", "Previous history", 1, 1),
+    ], ids=["no_session", "with_session"])
+    def test_query_flow(self, rag_system, session_id, history,
+                        expected_history_calls, expected_add_exchange):
+        """Test query with and without a session, and that tools are passed to the AI"""
+        session_manager = rag_system.session_manager
+        ai_generator = rag_system.ai_generator
+        session_manager.get_conversation_history.return_value = history
 
-        rag = RAGSystem(test_config)
-        response, sources = rag.query("Tell me more", session_id="session123")
+        response, sources = rag_system.query("What is Anthropic?", session_id=session_id)
 
         assert response == "AI response"
-        mock_rag_components['session_manager'].get_conversation_history.assert_called_once_with("session123")
-
-        call_kwargs = mock_rag_components['ai_generator'].generate_response.call_args[1]
-        assert call_kwargs["conversation_history"] == "Previous history"
-        mock_rag_components['session_manager'].add_exchange.assert_called_once()
-
-    def test_query_passes_tools_to_ai(self, mock_rag_components, test_config):
-        """Test that query passes tools to AI generator"""
-        rag = RAGSystem(test_config)
-        rag.query("What is Anthropic?")
-
-        call_kwargs = mock_rag_components['ai_generator'].generate_response.call_args[1]
-        assert "tools" in call_kwargs
+        assert isinstance(sources, list)
+        assert session_manager.get_conversation_history.call_count == expected_history_calls
+        assert session_manager.add_exchange.call_count == expected_add_exchange
+        if session_id:
+            session_manager.get_conversation_history.assert_called_once_with(session_id)
+
+        ai_generator.generate_response.assert_called_once()
+        call_kwargs = ai_generator.generate_response.call_args[1]
+        assert call_kwargs["conversation_history"] == history
         assert call_kwargs["tools"] is not None
-        assert "tool_manager" in call_kwargs
+        assert call_kwargs["tool_manager"] is rag_system.tool_manager
 
 
+@pytest.mark.xdist_group("rag_system")
 class TestRAGSystemWithToolExecution:
     """Test RAG system when AI uses tools"""
 
-    def test_query_with_search_tool_execution(self, mock_rag_components, test_config, sample_search_results):
+    def test_query_with_search_tool_execution(self, rag_system, sample_search_results):
         """Test complete flow when AI uses search tool"""
-        mock_rag_components['vector_store'].search.return_value = sample_search_results
-        mock_rag_components['vector_store'].get_lesson_link.return_value = "https://example.com/lesson0"
-        mock_rag_components['ai_generator'].generate_response.return_value = "Anthropic is an AI safety company."
+        rag_system.vector_store.configure_mock(**{
+            "search.return_value": sample_search_results,
+            "get_lesson_link.return_value": "https://example.com/lesson0",
+        })
+        rag_system.ai_generator.generate_response.return_value = "Anthropic is an AI safety company."
 
-        rag = RAGSystem(test_config)
-        response, sources = rag.query("What is Anthropic?")
+        response, sources = rag_system.query("What is Anthropic?")
 
-        assert "Anthropic" in response or "safety" in response.lower()
+        response_lower = response.lower()
+        assert "anthropic" in response_lower
 
-    def test_sources_tracked_after_search(self, mock_rag_components, test_config, sample_search_results):
+    def test_sources_tracked_after_search(self, rag_system, sample_search_results):
         """Test that sources are tracked after search tool execution"""
-        mock_rag_components['vector_store'].search.return_value = sample_search_results
-        mock_rag_components['vector_store'].get_lesson_link.return_value = "https://example.com/lesson1"
+        rag_system.vector_store.configure_mock(**{
+            "search.return_value": sample_search_results,
+            "get_lesson_link.return_value": "https://example.com/lesson1",
+        })
 
-        rag = RAGSystem(test_config)
-        rag.search_tool.execute(query="test")
-        sources = rag.tool_manager.get_last_sources()
+        rag_system.search_tool.execute(query="test")
+        sources = rag_system.tool_manager.get_last_sources()
 
         assert len(sources) > 0
         assert "text" in sources[0]
 
 
+@pytest.mark.xdist_group("rag_system")
 class TestRAGSystemWithBrokenConfig:
-    """Test RAG system behavior with MAX_RESULTS=0 bug"""
-
-    def test_query_with_zero_max_results(self, mock_rag_components, broken_config, empty_search_results):
-        """Test that MAX_RESULTS=0 causes search to return no results"""
-        mock_rag_components['vector_store'].search.return_value = empty_search_results
-        mock_rag_components['vector_store'].max_results = 0
-        mock_rag_components['ai_generator'].generate_response.return_value = (
-            "I couldn't retrieve any relevant information about that topic."
-        )
-
-        rag = RAGSystem(broken_config)
-        assert broken_config.MAX_RESULTS == 0, "This test requires MAX_RESULTS=0"
-
-        response, sources = rag.query("What is Anthropic?")
-
-        assert "couldn't retrieve" in response.lower() or "no relevant content" in response.lower()
-        assert len(sources) == 0
-
-    def test_comparison_working_vs_broken_config(self, test_config, broken_config, sample_search_results, empty_search_results):
-        """Test to show the difference between working and broken config"""
-        # Test with WORKING config
-        with patch('rag_system.VectorStore') as mock_vs_w, \
-             patch('rag_system.AIGenerator') as mock_ai_w, \
-             patch('rag_system.SessionManager') as mock_sm_w:
-
-            mock_vector_store_working = Mock()
-            mock_vector_store_working.search.return_value = sample_search_results
-            mock_vector_store_working.max_results = 5
-            mock_vector_store_working.get_lesson_link.return_value = "https://example.com"
-            mock_vs_w.return_value = mock_vector_store_working
+    """Test RAG system behavior with the working config and the MAX_RESULTS=0 bug"""
 
-            mock_ai_working = Mock()
-            mock_ai_working.generate_response.return_value = "Anthropic is an AI safety company that builds Claude."
-            mock_ai_w.return_value = mock_ai_working
+    def test_query_under_config(self, rag_under_config):
+        """Test that RAGSystem passes MAX_RESULTS to VectorStore and the query reflects the resulting limit"""
+        rag, config, vector_store_class, expected_fragment, expected_sources_len = rag_under_config
 
-            mock_sm_w.return_value = Mock()
+        assert _recorded_max_results(vector_store_class) == config.MAX_RESULTS
 
-            rag_working = RAGSystem(test_config)
-            response_working, _ = rag_working.query("What is Anthropic?")
-
-        # Test with BROKEN config
-        with patch('rag_system.VectorStore') as mock_vs_b, \
-             patch('rag_system.AIGenerator') as mock_ai_b, \
-             patch('rag_system.SessionManager') as mock_sm_b:
-
-            mock_vector_store_broken = Mock()
-            mock_vector_store_broken.search.return_value = empty_search_results
-            mock_vector_store_broken.max_results = 0
-            mock_vs_b.return_value = mock_vector_store_broken
-
-            mock_ai_broken = Mock()
-            mock_ai_broken.generate_response.return_value = "I couldn't retrieve information."
-            mock_ai_b.return_value = mock_ai_broken
-
-            mock_sm_b.return_value = Mock()
-
-            rag_broken = RAGSystem(broken_config)
-            response_broken, _ = rag_broken.query("What is Anthropic?")
+        response, sources = rag.query("What is Anthropic?")
 
-        # Comparisons
-        assert "Anthropic" in response_working
-        assert "couldn't" in response_broken.lower()
-        assert response_working != response_broken
+        assert expected_fragment in response
+        assert len(sources) == expected_sources_len
 
 
+@pytest.mark.xdist_group("rag_system")
 class TestRAGSystemCourseManagement:
     """Test RAG system course analytics"""
 
-    def test_get_course_analytics(self, mock_rag_components, test_config):
+    def test_get_course_analytics(self, rag_system):
         """Test getting course analytics"""
-        mock_rag_components['vector_store'].get_course_count.return_value = 3
-        mock_rag_components['vector_store'].get_existing_course_titles.return_value = [
-            "Course 1", "Course 2", "Course 3"
-        ]
+        rag_system.vector_store.configure_mock(**{
+            "get_course_count.return_value": 3,
+            "get_existing_course_titles.return_value": ["Course 1", "Course 2", "Course 3"],
+        })
 
-        rag = RAGSystem(test_config)
-        analytics = rag.get_course_analytics()
+        analytics = rag_system.get_course_analytics()
 
         assert analytics["total_courses"] == 3
         assert len(analytics["course_titles"]) == 3
@@ -2,11 +2,23 @@
 Unit tests for search_tools.py - CourseSearchTool and CourseOutlineTool
 """
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, patch, DEFAULT
 from search_tools import CourseSearchTool, CourseOutlineTool, ToolManager
-from vector_store import SearchResults
+from vector_store import VectorStore
 
 
+_EXPECTED_SEARCH_NAME = "search_course_content"
+_EXPECTED_OUTLINE_NAME = "get_course_outline"
+
+
+@pytest.fixture
+def empty_search_tool(mock_vector_store, empty_search_results):
+    """Create a CourseSearchTool whose vector store finds nothing"""
+    mock_vector_store.search.return_value = empty_search_results
+    return CourseSearchTool(mock_vector_store)
+
+
+@pytest.mark.xdist_group("search_tools")
 class TestCourseSearchTool:
     """Test suite for CourseSearchTool"""
 
@@ -16,7 +28,7 @@ class TestCourseSearchTool:
         definition = tool.get_tool_definition()
 
         assert definition["type"] == "function"
-        assert definition["function"]["name"] == "search_course_content"
+        assert definition["function"]["name"] == _EXPECTED_SEARCH_NAME
         assert "description" in definition["function"]
         assert "parameters" in definition["function"]
         assert definition["function"]["parameters"]["required"] == ["query"]
@@ -32,47 +44,24 @@ class TestCourseSearchTool:
         assert tool.last_sources[0]["text"] == "Building Towards Computer Use with Anthropic - Lesson 0"
         assert "url" in tool.last_sources[0]
 
-    def test_execute_with_empty_results(self, mock_vector_store, empty_search_results):
-        """Test execute when no results are found"""
-        mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="nonexistent topic")
-
-        assert "No relevant content found" in result
-
-    def test_execute_with_course_filter(self, mock_vector_store, empty_search_results):
-        """Test execute with course_name filter"""
-        mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="test", course_name="Computer Use")
-
-        assert "in course 'Computer Use'" in result
-        mock_vector_store.search.assert_called_once_with(
-            query="test", course_name="Computer Use", lesson_number=None
-        )
-
-    def test_execute_with_lesson_filter(self, mock_vector_store, empty_search_results):
-        """Test execute with lesson_number filter"""
-        mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="test", lesson_number=1)
-
-        assert "in lesson 1" in result
-        mock_vector_store.search.assert_called_once_with(
-            query="test", course_name=None, lesson_number=1
-        )
-
-    def test_execute_with_both_filters(self, mock_vector_store, empty_search_results):
-        """Test execute with both course_name and lesson_number filters"""
-        mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="test", course_name="Computer Use", lesson_number=2)
-
-        assert "in course 'Computer Use'" in result
-        assert "in lesson 2" in result
-        mock_vector_store.search.assert_called_once_with(
-            query="test", course_name="Computer Use", lesson_number=2
-        )
+    @pytest.mark.parametrize("kwargs,expected_substrings,expected_search_call", [
+        ({"query": "nonexistent topic"}, ["No relevant content found"],
+         {"query": "nonexistent topic", "course_name": None, "lesson_number": None}),
+        ({"query": "test", "course_name": "Computer Use"}, ["in course 'Computer Use'"],
+         {"query": "test", "course_name": "Computer Use", "lesson_number": None}),
+        ({"query": "test", "lesson_number": 1}, ["in lesson 1"],
+         {"query": "test", "course_name": None, "lesson_number": 1}),
+        ({"query": "test", "course_name": "Computer Use", "lesson_number": 2},
+         ["in course 'Computer Use'", "in lesson 2"],
+         {"query": "test", "course_name": "Computer Use", "lesson_number": 2}),
+    ], ids=["no_filter", "course", "lesson", "course_and_lesson"])
+    def test_execute_filter_combinations(self, empty_search_tool, kwargs, expected_substrings, expected_search_call):
+        """Test execute with no results, reporting each combination of course/lesson filters"""
+        result = empty_search_tool.execute(**kwargs)
+
+        for expected in expected_substrings:
+            assert expected in result
+        empty_search_tool.store.search.assert_called_once_with(**expected_search_call)
 
     def test_execute_with_error(self, mock_vector_store, error_search_results):
         """Test execute when search returns an error"""
@@ -92,15 +81,15 @@ class TestCourseSearchTool:
             assert "text" in source
             assert "url" in source
 
-    def test_format_results_without_lesson_number(self, mock_vector_store):
+    def test_format_results_without_lesson_number(self, mock_vector_store, make_search_results):
         """Test formatting when metadata doesn't include lesson_number"""
-        mock_vector_store.search.return_value = SearchResults(
-            documents=["Some course content without lesson number"],
-            metadata=[{"course_title": "Test Course"}],
-            distances=[0.1],
-            error=None
-        )
-        mock_vector_store.get_lesson_link.return_value = None
+        mock_vector_store.configure_mock(**{
+            "search.return_value": make_search_results(
+                ["Some course content without lesson number"],
+                [{"course_title": "Test Course"}]
+            ),
+            "get_lesson_link.return_value": None,
+        })
 
         tool = CourseSearchTool(mock_vector_store)
         result = tool.execute(query="test")
@@ -110,25 +99,24 @@ class TestCourseSearchTool:
         assert len(tool.last_sources) == 1
         assert tool.last_sources[0]["text"] == "Test Course"
 
-    def test_last_sources_reset_between_searches(self, mock_vector_store_with_results):
+    def test_last_sources_reset_between_searches(self, mock_vector_store_with_results, make_search_results):
         """Test that last_sources is properly updated on each search"""
         tool = CourseSearchTool(mock_vector_store_with_results)
 
         tool.execute(query="first query")
-        first_sources = tool.last_sources.copy()
+        first_text = tool.last_sources[0]["text"]
 
-        mock_vector_store_with_results.search.return_value = SearchResults(
-            documents=["Different content"],
-            metadata=[{"course_title": "Different Course", "lesson_number": 5}],
-            distances=[0.1],
-            error=None
+        mock_vector_store_with_results.search.return_value = make_search_results(
+            ["Different content"],
+            [{"course_title": "Different Course", "lesson_number": 5}]
         )
         tool.execute(query="second query")
 
-        assert tool.last_sources != first_sources
+        assert tool.last_sources[0]["text"] != first_text
         assert tool.last_sources[0]["text"] == "Different Course - Lesson 5"
 
 
+@pytest.mark.xdist_group("search_tools")
 class TestCourseOutlineTool:
     """Test suite for CourseOutlineTool"""
 
@@ -138,7 +126,7 @@ class TestCourseOutlineTool:
         definition = tool.get_tool_definition()
 
         assert definition["type"] == "function"
-        assert definition["function"]["name"] == "get_course_outline"
+        assert definition["function"]["name"] == _EXPECTED_OUTLINE_NAME
         assert "description" in definition["function"]
         assert definition["function"]["parameters"]["required"] == ["course_title"]
 
@@ -171,55 +159,64 @@ class TestCourseOutlineTool:
 
         assert "No course found matching 'NonExistentCourse'" in result
 
-    @pytest.mark.parametrize("missing_field,expected_missing", [
-        ("instructor", "Instructor:"),
-        ("course_link", "Link:")
-    ])
-    def test_format_outline_with_missing_fields(self, mock_vector_store, missing_field, expected_missing):
+    def test_format_outline_with_missing_fields(self, mock_vector_store):
         """Test formatting outline when optional fields are missing"""
-        outline_data = {
-            "course_title": "Test Course",
-            "course_link": "https://example.com",
-            "instructor": "Test Instructor",
-            "lessons": []
-        }
-        del outline_data[missing_field]
-        mock_vector_store.get_course_outline.return_value = outline_data
-
         tool = CourseOutlineTool(mock_vector_store)
-        result = tool.execute(course_title="Test Course")
 
-        assert expected_missing not in result
-        assert "Test Course" in result
+        for missing_field, expected_missing in [("instructor", "Instructor:"), ("course_link", "Link:")]:
+            outline_data = {
+                "course_title": "Test Course",
+                "course_link": "https://example.com",
+                "instructor": "Test Instructor",
+                "lessons": []
+            }
+            del outline_data[missing_field]
+            mock_vector_store.get_course_outline.return_value = outline_data
+
+            result = tool.execute(course_title="Test Course")
+
+            assert expected_missing not in result, f"{expected_missing!r} shown without {missing_field}"
+            assert "Test Course" in result
+
 
+@pytest.fixture(scope="class")
+def populated_manager(rag_component_specs, sample_search_results):
+    """Create one ToolManager per class with both course tools registered"""
+    store = Mock(spec=rag_component_specs['vector_store'], **{
+        "search.return_value": sample_search_results,
+        "get_lesson_link.return_value": "https://example.com/lesson0",
+    })
+    manager = ToolManager()
+    manager.register_tool(CourseSearchTool(store))
+    manager.register_tool(CourseOutlineTool(store))
+    return manager
 
+
+@pytest.fixture
+def manager(populated_manager):
+    """Hand out the class-wide ToolManager with sources from earlier tests cleared"""
+    populated_manager.reset_sources()
+    return populated_manager
+
+
+@pytest.mark.xdist_group("search_tools")
 class TestToolManager:
     """Test suite for ToolManager"""
 
-    def test_register_tool(self, mock_vector_store):
+    def test_register_tool(self, manager):
         """Test registering a tool"""
-        manager = ToolManager()
-        tool = CourseSearchTool(mock_vector_store)
-        manager.register_tool(tool)
-
         assert "search_course_content" in manager.tools
+        assert "get_course_outline" in manager.tools
 
-    def test_get_tool_definitions(self, mock_vector_store):
+    def test_get_tool_definitions(self, manager):
         """Test getting all tool definitions"""
-        manager = ToolManager()
-        manager.register_tool(CourseSearchTool(mock_vector_store))
-        manager.register_tool(CourseOutlineTool(mock_vector_store))
-
         definitions = manager.get_tool_definitions()
         assert len(definitions) == 2
         tool_names = {d["function"]["name"] for d in definitions}
-        assert tool_names == {"search_course_content", "get_course_outline"}
+        assert tool_names == {_EXPECTED_SEARCH_NAME, _EXPECTED_OUTLINE_NAME}
 
-    def test_execute_tool(self, mock_vector_store_with_results):
+    def test_execute_tool(self, manager):
         """Test executing a tool by name"""
-        manager = ToolManager()
-        manager.register_tool(CourseSearchTool(mock_vector_store_with_results))
-
         result = manager.execute_tool("search_course_content", query="test query")
         assert "Building Towards Computer Use with Anthropic" in result
 
@@ -230,22 +227,16 @@ class TestToolManager:
 
         assert "Tool 'nonexistent_tool' not found" in result
 
-    def test_get_last_sources(self, mock_vector_store_with_results):
+    def test_get_last_sources(self, manager):
         """Test getting sources from last search"""
-        manager = ToolManager()
-        manager.register_tool(CourseSearchTool(mock_vector_store_with_results))
-
         manager.execute_tool("search_course_content", query="test")
         sources = manager.get_last_sources()
 
         assert len(sources) > 0
         assert "text" in sources[0]
 
-    def test_reset_sources(self, mock_vector_store_with_results):
+    def test_reset_sources(self, manager):
         """Test resetting sources"""
-        manager = ToolManager()
-        manager.register_tool(CourseSearchTool(mock_vector_store_with_results))
-
         manager.execute_tool("search_course_content", query="test")
         assert len(manager.get_last_sources()) > 0
 
@@ -253,13 +244,12 @@ class TestToolManager:
         assert len(manager.get_last_sources()) == 0
 
 
+@pytest.mark.xdist_group("search_tools")
 class TestMaxResultsBug:
     """Tests specifically designed to expose the MAX_RESULTS=0 bug"""
 
     def test_vector_store_with_zero_max_results(self, broken_config):
         """Test that MAX_RESULTS=0 causes issues"""
-        from vector_store import VectorStore
-
         mock_collection = Mock()
         mock_collection.query.return_value = {
             "documents": [[]],
@@ -267,10 +257,9 @@ class TestMaxResultsBug:
             "distances": [[]]
         }
 
-        with patch('chromadb.PersistentClient') as mock_client:
-            mock_client_instance = Mock()
-            mock_client_instance.get_or_create_collection.return_value = mock_collection
-            mock_client.return_value = mock_client_instance
+        # Patch the names vector_store bound at import so the real ChromaDB and embedding model are never used
+        with patch.multiple('vector_store', chromadb=DEFAULT, Settings=DEFAULT, SentenceTransformer=DEFAULT) as mocks:
+            mocks['chromadb'].PersistentClient.return_value.get_or_create_collection.return_value = mock_collection
 
             store = VectorStore(
                 chroma_path=broken_config.CHROMA_PATH,
@@ -285,10 +274,9 @@ class TestMaxResultsBug:
             assert call_kwargs["n_results"] == 0, "MAX_RESULTS=0 should cause n_results=0"
             assert results.is_empty()
 
-    def test_search_tool_with_zero_results(self, empty_search_results):
+    def test_search_tool_with_zero_results(self, rag_component_specs, empty_search_results):
         """Test CourseSearchTool when vector store returns 0 results due to MAX_RESULTS=0"""
-        mock_store = Mock()
-        mock_store.search.return_value = empty_search_results
+        mock_store = Mock(spec=rag_component_specs['vector_store'], **{"search.return_value": empty_search_results})
 
         tool = CourseSearchTool(mock_store)
         result = tool.execute(query="What is Anthropic?")
@@ -1,34 +1,60 @@
 """
 Tests for sequential tool calling functionality in ai_generator.py
 """
+import functools
+import itertools
+import json
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
-import sys
-import os
-
-# Add backend to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from ai_generator import AIGenerator
 from search_tools import ToolManager, CourseSearchTool
 
 
 def create_mock_response(content, tool_calls=None):
-    """Helper to create a mock Azure OpenAI response"""
-    mock_response = Mock()
-    mock_response.choices = [Mock()]
-    mock_response.choices[0].message.content = content
-    mock_response.choices[0].message.tool_calls = tool_calls
-    return mock_response
+    """Helper to create a stub Azure OpenAI response"""
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@functools.lru_cache(maxsize=64)
+def _dumps_frozen(items):
+    """Serialize tool-call arguments given as sorted (key, value) pairs, memoized across calls"""
+    return json.dumps(dict(items))
+
+
+def _dumps_arguments(arguments):
+    """Serialize tool-call arguments, falling back to a plain dump for unhashable values"""
+    try:
+        return _dumps_frozen(tuple(sorted(arguments.items())))
+    except TypeError:
+        return json.dumps(arguments)
 
 
 def create_mock_tool_call(tool_id, function_name, arguments):
-    """Helper to create a mock tool call"""
-    import json
-    tool_call = Mock()
-    tool_call.id = tool_id
-    tool_call.function.name = function_name
-    tool_call.function.arguments = json.dumps(arguments) if isinstance(arguments, dict) else arguments
-    return tool_call
+    """Helper to create a stub tool call"""
+    return SimpleNamespace(
+        id=tool_id,
+        function=SimpleNamespace(
+            name=function_name,
+            arguments=_dumps_arguments(arguments) if isinstance(arguments, dict) else arguments
+        )
+    )
+
+
+class StubToolManager:
+    """Tool manager stub that replays canned execute_tool results and records each call"""
+
+    def __init__(self, results):
+        self._results = iter(results)
+        self.calls = []
+
+    def execute_tool(self, tool_name, **kwargs):
+        self.calls.append((tool_name, kwargs))
+        result = next(self._results)
+        if isinstance(result, Exception):
+            raise result
+        return result
 
 
 class TestSequentialToolCalling:
@@ -66,11 +92,10 @@ class TestSequentialToolCalling:
         mock_azure_client_class.return_value = mock_client
 
         # Mock tool manager
-        tool_manager = Mock()
-        tool_manager.execute_tool.side_effect = [
+        tool_manager = StubToolManager([
             "Course: MCP\nLesson 4: Building Custom Servers",
             "[Advanced RAG - Lesson 3] Building custom servers..."
-        ]
+        ])
 
         generator = ai_generator_factory()
 
@@ -87,7 +112,7 @@ class TestSequentialToolCalling:
         assert "Advanced RAG" in response
 
         # Verify both tools were executed
-        assert tool_manager.execute_tool.call_count == 2
+        assert len(tool_manager.calls) == 2
 
         # Verify tools were included in ALL API calls
         for call_args in mock_client.chat.completions.create.call_args_list:
@@ -109,8 +134,7 @@ class TestSequentialToolCalling:
         ]
         mock_azure_client_class.return_value = mock_client
 
-        tool_manager = Mock()
-        tool_manager.execute_tool.return_value = "Tool result"
+        tool_manager = StubToolManager(itertools.repeat("Tool result"))
 
         generator = ai_generator_factory()
 
@@ -123,7 +147,7 @@ class TestSequentialToolCalling:
 
         # Should make 3 API calls: 2 rounds + 1 final synthesis
         assert mock_client.chat.completions.create.call_count == 3
-        assert tool_manager.execute_tool.call_count == 2
+        assert len(tool_manager.calls) == 2
         assert "available information" in response
 
     @patch('ai_generator.AzureOpenAI')
@@ -139,8 +163,7 @@ class TestSequentialToolCalling:
         mock_client.chat.completions.create.side_effect = [response_1, response_2]
         mock_azure_client_class.return_value = mock_client
 
-        tool_manager = Mock()
-        tool_manager.execute_tool.return_value = "Search results"
+        tool_manager = StubToolManager(itertools.repeat("Search results"))
 
         generator = ai_generator_factory()
 
@@ -165,8 +188,7 @@ class TestSequentialToolCalling:
         mock_client.chat.completions.create.side_effect = [response_1, response_2]
         mock_azure_client_class.return_value = mock_client
 
-        tool_manager = Mock()
-        tool_manager.execute_tool.side_effect = Exception("Database connection failed")
+        tool_manager = StubToolManager(itertools.repeat(Exception("Database connection failed")))
 
         generator = ai_generator_factory()
 
@@ -0,0 +1,329 @@
+"""
+Unit tests for token_manager.py - TokenManager OAuth token caching and refresh
+
+These tests verify that the TokenManager correctly:
+1. Serves a cached token until its refresh deadline
+2. Refreshes over HTTP once the deadline passes
+3. Sends the pre-encoded OAuth request and retries gateway errors
+4. Coalesces concurrent async refreshes into one request
+5. Surfaces OAuth failures as RuntimeError
+6. Is shared process-wide by create_token_manager_from_env until cache_clear
+"""
+import asyncio
+import pytest
+import httpx
+from unittest.mock import patch
+from urllib3.response import HTTPResponse
+from urllib3.util.retry import Retry
+
+import token_manager
+from token_manager import TokenManager, create_token_manager_from_env
+
+
+TOKEN_URL = "https://okta.example.com/oauth2/v1/token"
+
+_EXPECTED_BODY = (
+    b"client_id=test-client&client_secret=test-secret"
+    b"&grant_type=client_credentials&scope=versa.web+versa.chat+versa.assistant"
+)
+
+
+@pytest.fixture
+def manager():
+    """Create a TokenManager with test credentials and an empty cache"""
+    return TokenManager("test-client", "test-secret", TOKEN_URL)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drive token_manager's monotonic clock from the test; returns a one-item list holding the current value"""
+    now = [1000.0]
+    monkeypatch.setattr(token_manager, "_monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def async_token_endpoint(monkeypatch):
+    """Route the async client through an httpx.MockTransport.
+
+    Returns a dict whose "responses" list is popped (last one repeats) for each
+    request, whose "calls" counter records how many requests were made, and whose
+    "transport_kwargs" holds the arguments the last transport was built with.
+    """
+    endpoint = {"calls": 0, "responses": [httpx.Response(200, json={"access_token": "async-token"})]}
+
+    async def handler(request):
+        endpoint["calls"] += 1
+        # Yield so every concurrent waiter reaches get_token_async before the refresh resolves
+        await asyncio.sleep(0)
+        responses = endpoint["responses"]
+        return responses.pop(0) if len(responses) > 1 else responses[0]
+
+    def transport(**kwargs):
+        endpoint["transport_kwargs"] = kwargs
+        return httpx.MockTransport(handler)
+
+    monkeypatch.setattr(token_manager.httpx, "AsyncHTTPTransport", transport)
+    return endpoint
+
+
+class TestGetToken:
+    """Test the sync token cache, refresh deadline, and OAuth request"""
+
+    def test_valid_cached_token_skips_http(self, manager, requests_mock):
+        """Test that a cached token within its deadline is returned without another request"""
+        requests_mock.post(TOKEN_URL, json={"access_token": "token-1", "expires_in": 3600})
+
+        assert manager.get_token() == "token-1"
+        assert manager.get_token() == "token-1"
+        assert requests_mock.call_count == 1
+
+    def test_valid_cached_token_skips_lock(self, manager, requests_mock):
+        """Test that the fast path returns a valid token without entering the lock"""
+        requests_mock.post(TOKEN_URL, json={"access_token": "token-1", "expires_in": 3600})
+        manager.get_token()
+        manager._lock = None  # any `with self._lock` would now raise
+
+        assert manager.get_token() == "token-1"
+
+    def test_refresh_after_monotonic_deadline(self, manager, requests_mock, clock):
+        """Test that the token is refreshed once time.monotonic passes expiry minus the buffer"""
+        requests_mock.post(TOKEN_URL, [
+            {"json": {"access_token": "token-1", "expires_in": 3600}},
+            {"json": {"access_token": "token-2", "expires_in": 3600}},
+        ])
+        deadline = clock[0] + 3600 - TokenManager.REFRESH_BUFFER_SECONDS
+        manager.get_token()
+
+        clock[0] = deadline - 1
+        assert manager.get_token() == "token-1"
+        assert requests_mock.call_count == 1
+
+        clock[0] = deadline
+        assert manager.get_token() == "token-2"
+        assert requests_mock.call_count == 2
+
+    def test_recheck_under_lock_uses_concurrent_refresh(self, manager, requests_mock):
+        """Test that a token refreshed by another thread while waiting on the lock is reused"""
+        requests_mock.post(TOKEN_URL, json={"access_token": "unused", "expires_in": 3600})
+        refreshed = token_manager.TokenData(
+            access_token="refreshed-elsewhere", expires_at=0.0, refresh_deadline=float("inf")
+        )
+
+        class RefreshedWhileWaiting:
+            """Lock stand-in that publishes another thread's refresh as it is acquired"""
+            def __enter__(self):
+                manager._cached_token = refreshed
+
+            def __exit__(self, *exc_info):
+                return False
+
+        manager._lock = RefreshedWhileWaiting()
+
+        assert manager.get_token() == "refreshed-elsewhere"
+        assert requests_mock.call_count == 0
+
+    def test_sends_encoded_body_headers_and_timeouts(self, manager, requests_mock):
+        """Test that the pre-encoded form body, headers, and connect/read timeouts are sent"""
+        requests_mock.post(TOKEN_URL, json={"access_token": "token-1"})
+
+        manager.get_token()
+
+        request = requests_mock.last_request
+        assert request.body == _EXPECTED_BODY
+        assert request.headers["Content-Type"] == "application/x-www-form-urlencoded"
+        assert request.timeout == (3, 10)
+
+    def test_gateway_errors_use_retry_policy(self, manager):
+        """Test that the session adapter retries gateway errors on POST, leaving the retry loop to urllib3"""
+        retry = manager._session.get_adapter(TOKEN_URL).max_retries
+
+        assert retry.total == TokenManager.MAX_RETRIES
+        assert set(retry.status_forcelist) == set(TokenManager.RETRY_STATUSES)
+        assert retry.allowed_methods == frozenset({"POST"})
+
+    def test_retry_after_header_is_ignored(self, manager):
+        """Test that a 503 with a long Retry-After is retried on the backoff schedule, not the header's"""
+        retry = manager._session.get_adapter(TOKEN_URL).max_retries
+        response = HTTPResponse(status=503, headers={"Retry-After": "3600"})
+        retry = retry.increment(method="POST", url=TOKEN_URL, response=response)
+
+        with patch.object(Retry, "sleep_for_retry") as honour_retry_after:
+            retry.sleep(response)
+
+        honour_retry_after.assert_not_called()
+        assert retry.get_backoff_time() < 1
+
+    def test_503_raises(self, manager, requests_mock):
+        """Test that a gateway error left after retries surfaces as RuntimeError"""
+        requests_mock.post(TOKEN_URL, status_code=503)
+
+        with pytest.raises(RuntimeError, match="OAuth token request failed: 503"):
+            manager.get_token()
+
+    def test_missing_access_token_raises(self, manager, requests_mock):
+        """Test that a response without access_token is rejected"""
+        requests_mock.post(TOKEN_URL, json={"expires_in": 3600})
+
+        with pytest.raises(RuntimeError, match="missing 'access_token'"):
+            manager.get_token()
+
+
+async def _gather_tokens(manager, count):
+    """Request a token from `count` concurrent coroutines"""
+    return await asyncio.gather(*(manager.get_token_async() for _ in range(count)), return_exceptions=True)
+
+
+class TestGetTokenAsync:
+    """Test the async refresh path and its single in-flight request"""
+
+    def test_concurrent_waiters_share_one_request(self, manager, async_token_endpoint):
+        """Test that concurrent callers with an empty cache trigger exactly one refresh"""
+        tokens = asyncio.run(_gather_tokens(manager, 10))
+
+        assert tokens == ["async-token"] * 10
+        assert async_token_endpoint["calls"] == 1
+
+    def test_cached_token_skips_request(self, manager, async_token_endpoint):
+        """Test that a second call is served from the cache"""
+        async def fetch_twice():
+            await manager.get_token_async()
+            return await manager.get_token_async()
+
+        assert asyncio.run(fetch_twice()) == "async-token"
+        assert async_token_endpoint["calls"] == 1
+
+    def test_gateway_error_retried_within_one_refresh(self, manager, async_token_endpoint):
+        """Test that a 503 is retried inside the shared refresh, like the sync session's Retry policy"""
+        manager.RETRY_BACKOFF_SECONDS = 0
+        async_token_endpoint["responses"] = [
+            httpx.Response(503),
+            httpx.Response(200, json={"access_token": "async-token"}),
+        ]
+
+        tokens = asyncio.run(_gather_tokens(manager, 5))
+
+        assert tokens == ["async-token"] * 5
+        assert async_token_endpoint["calls"] == 2
+
+    def test_error_reaches_every_waiter(self, manager, async_token_endpoint):
+        """Test that a refresh failing after all retries raises RuntimeError in all concurrent callers"""
+        manager.RETRY_BACKOFF_SECONDS = 0
+        async_token_endpoint["responses"] = [httpx.Response(503)]
+
+        results = asyncio.run(_gather_tokens(manager, 5))
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert "OAuth token request failed" in str(results[0])
+        assert async_token_endpoint["calls"] == 1 + TokenManager.MAX_RETRIES
+
+    def test_non_gateway_error_is_not_retried(self, manager, async_token_endpoint):
+        """Test that a 401 fails the refresh immediately"""
+        async_token_endpoint["responses"] = [httpx.Response(401)]
+
+        with pytest.raises(RuntimeError, match="401"):
+            asyncio.run(manager.get_token_async())
+
+        assert async_token_endpoint["calls"] == 1
+
+    def test_inflight_reset_after_failure(self, manager, async_token_endpoint):
+        """Test that a failed refresh clears the in-flight task so the next call retries"""
+        async_token_endpoint["responses"] = [
+            httpx.Response(401),
+            httpx.Response(200, json={"access_token": "retried-token"}),
+        ]
+
+        async def fail_then_retry():
+            with pytest.raises(RuntimeError):
+                await manager.get_token_async()
+            assert manager._inflight is None
+            return await manager.get_token_async()
+
+        assert asyncio.run(fail_then_retry()) == "retried-token"
+        assert async_token_endpoint["calls"] == 2
+
+    def test_new_event_loop_gets_fresh_client(self, manager, async_token_endpoint):
+        """Test that a client bound to a finished event loop is closed and replaced, not reused"""
+        asyncio.run(manager.get_token_async())
+        first_client = manager._async_client
+        manager.clear_cache()
+
+        assert asyncio.run(manager.get_token_async()) == "async-token"
+        assert manager._async_client is not first_client
+        assert first_client.is_closed
+
+    def test_async_pool_matches_sync_pool_size(self, manager, async_token_endpoint):
+        """Test that the async transport's connection pool is capped at 4, like the sync session"""
+        asyncio.run(manager.get_token_async())
+
+        assert async_token_endpoint["transport_kwargs"]["limits"].max_connections == 4
+
+    def test_aclose_closes_client(self, manager, async_token_endpoint):
+        """Test that aclose closes the async client and drops it"""
+        async def fetch_and_close():
+            await manager.get_token_async()
+            client = manager._async_client
+            await manager.aclose()
+            return client
+
+        client = asyncio.run(fetch_and_close())
+
+        assert client.is_closed
+        assert manager._async_client is None
+
+
+@pytest.fixture
+def token_env(monkeypatch):
+    """Start each factory test with no OAuth env vars and an empty factory cache"""
+    for name in ("VERSA_CLIENT_ID", "VERSA_CLIENT_SECRET", "OKTA_TOKEN_URL"):
+        monkeypatch.delenv(name, raising=False)
+    create_token_manager_from_env.cache_clear()
+    yield monkeypatch
+    create_token_manager_from_env.cache_clear()
+
+
+class TestCreateTokenManagerFromEnv:
+    """Test the memoized factory that reads OAuth credentials from the environment"""
+
+    def test_repeated_calls_share_one_instance(self, token_env):
+        """Test that every caller gets the same TokenManager, and so the same token cache"""
+        token_env.setenv("VERSA_CLIENT_ID", "env-client")
+        token_env.setenv("VERSA_CLIENT_SECRET", "env-secret")
+        token_env.setenv("OKTA_TOKEN_URL", TOKEN_URL)
+
+        first = create_token_manager_from_env()
+
+        assert first is create_token_manager_from_env()
+        assert first.client_id == "env-client"
+        assert first.token_url == TOKEN_URL
+
+    def test_cache_clear_picks_up_new_values(self, token_env):
+        """Test that changed env vars are ignored until cache_clear, then read"""
+        token_env.setenv("VERSA_CLIENT_ID", "old-client")
+        token_env.setenv("VERSA_CLIENT_SECRET", "old-secret")
+        old = create_token_manager_from_env()
+
+        token_env.setenv("VERSA_CLIENT_ID", "new-client")
+        token_env.setenv("OKTA_TOKEN_URL", TOKEN_URL)
+        assert create_token_manager_from_env() is old
+
+        create_token_manager_from_env.cache_clear()
+        new = create_token_manager_from_env()
+
+        assert new is not old
+        assert new.client_id == "new-client"
+        assert new.token_url == TOKEN_URL
+
+    def test_cached_none_replaced_after_credentials_set(self, token_env):
+        """Test that a None result without credentials is cached, and replaced after cache_clear"""
+        assert create_token_manager_from_env() is None
+
+        token_env.setenv("VERSA_CLIENT_ID", "late-client")
+        token_env.setenv("VERSA_CLIENT_SECRET", "late-secret")
+        assert create_token_manager_from_env() is None
+
+        create_token_manager_from_env.cache_clear()
+        manager = create_token_manager_from_env()
+
+        assert isinstance(manager, TokenManager)
+        assert manager.client_id == "late-client"
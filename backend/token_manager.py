@@ -5,20 +5,30 @@ This module handles OAuth token fetching from Okta, caching tokens with
 expiration tracking, and automatic token refresh before expiration.
 """
 
+import asyncio
+import functools
 import os
 import time
 import threading
 from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+from urllib.parse import urlencode
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dataclasses import dataclass
 
+# Clock for refresh deadlines, bound at module level so tests can drive it
+# without replacing time.monotonic for everything else in the process
+_monotonic = time.monotonic
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class TokenData:
-    """Represents a cached OAuth token with expiration tracking"""
+    """Represents a cached OAuth token with expiration tracking (immutable, replaced on refresh)"""
     access_token: str
-    expires_at: float  # Unix timestamp
+    expires_at: float  # Unix timestamp, used for logging only
+    refresh_deadline: float  # time.monotonic() value after which the token should be refreshed
 
 
 class TokenManager:
@@ -35,6 +45,11 @@ class TokenManager:
     # Refresh token 5 minutes before expiration (safety buffer)
     REFRESH_BUFFER_SECONDS = 300
 
+    # Gateway errors retried by both the sync session and the async refresh
+    RETRY_STATUSES = (502, 503, 504)
+    MAX_RETRIES = 2
+    RETRY_BACKOFF_SECONDS = 0.2
+
     def __init__(self, client_id: str, client_secret: str, token_url: str):
         """
         Initialize TokenManager with OAuth credentials.
@@ -57,16 +72,53 @@ class TokenManager:
         self.client_secret = client_secret
         self.token_url = token_url
 
+        # Request headers and form body never change for the lifetime of the manager,
+        # so encode them once instead of on every refresh
+        self._headers = {
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+        self._encoded_body = urlencode({
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "grant_type": "client_credentials",
+            "scope": "versa.web versa.chat versa.assistant"
+        }).encode("ascii")
+
+        # Pooled session keeps the TLS connection to Okta warm across refreshes;
+        # client-credentials grants are safe to retry on gateway errors. Retry-After
+        # is ignored because refreshes run under the lock: an unbounded server-chosen
+        # wait would stall every get_token() caller, so backoff_factor sets the delays.
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=self.MAX_RETRIES,
+                backoff_factor=self.RETRY_BACKOFF_SECONDS,
+                status_forcelist=self.RETRY_STATUSES,
+                allowed_methods=frozenset({"POST"}),
+                respect_retry_after_header=False,
+                raise_on_status=False
+            )
+        ))
+
         # Thread-safe token cache
         self._lock = threading.Lock()
         self._cached_token: Optional[TokenData] = None
 
+        # Async refresh state: the client is created on first use inside an event loop
+        # (and recreated if a different loop calls in), and _inflight holds the refresh
+        # task that concurrent waiters on the same loop share
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Optional[asyncio.Task] = None
+
     def get_token(self) -> str:
         """
         Get a valid OAuth token, fetching or refreshing as needed.
 
         This method is thread-safe and handles:
-        - Returning cached token if still valid
+        - Returning cached token if still valid (lock-free fast path)
         - Fetching new token if none cached
         - Refreshing token if close to expiration
 
@@ -76,17 +128,139 @@ class TokenManager:
         Raises:
             RuntimeError: If token fetch fails
         """
-        with self._lock:
-            # Check if we need to fetch/refresh token
-            if self._is_token_expired():
-                self._fetch_and_cache_token()
+        # Fast path: TokenData is immutable and swapped in whole, so an unlocked read is safe
+        token = self._cached_token
+        if token is not None and _monotonic() < token.refresh_deadline:
+            return token.access_token
 
-            # Return cached token
-            if self._cached_token:
+        with self._lock:
+            # Re-check under the lock in case another thread refreshed while we waited
+            if not self._is_token_expired():
                 return self._cached_token.access_token
+            token = self._fetch_and_cache_token()
+
+        # Log success outside the lock
+        self._log_refresh(token)
+        return token.access_token
+
+    async def get_token_async(self) -> str:
+        """
+        Get a valid OAuth token without blocking the event loop.
+
+        Async counterpart of get_token for coroutine callers. Concurrent
+        callers that find the token expired share a single in-flight
+        refresh instead of each issuing their own request.
+
+        Returns:
+            Valid OAuth access token string
+
+        Raises:
+            RuntimeError: If token fetch fails
+        """
+        token = self._cached_token
+        if token is not None and _monotonic() < token.refresh_deadline:
+            return token.access_token
+
+        # No await between the check and the assignment, so the event loop
+        # guarantees only one refresh task is started. A task left over from
+        # another loop can't be awaited here, so it is replaced.
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight
+        if inflight is None or inflight.get_loop() is not loop:
+            inflight = self._inflight = loop.create_task(self._refresh_async())
+
+        token = await asyncio.shield(inflight)
+        return token.access_token
+
+    async def _refresh_async(self) -> TokenData:
+        """
+        Fetch a new token over the async client and cache it.
+
+        Retries the same gateway errors (RETRY_STATUSES, up to MAX_RETRIES
+        times with exponential backoff) as the sync session's Retry policy;
+        the transport itself additionally retries failed connection attempts.
+
+        Returns:
+            The newly cached TokenData
+
+        Raises:
+            RuntimeError: If OAuth request fails or returns invalid response
+        """
+        task = asyncio.current_task()
+        try:
+            client = await self._get_async_client()
+            for attempt in range(self.MAX_RETRIES + 1):
+                response = await client.post(
+                    self.token_url,
+                    headers=self._headers,
+                    content=self._encoded_body
+                )
+                if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_RETRIES:
+                    break
+                await asyncio.sleep(self.RETRY_BACKOFF_SECONDS * 2 ** attempt)
+            response.raise_for_status()
+            token = self._cache_token_response(response.json())
 
-            # Should not reach here if _fetch_and_cache_token works correctly
-            raise RuntimeError("Failed to obtain valid token")
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"OAuth token request failed: {str(e)}") from e
+        except (KeyError, ValueError) as e:
+            raise RuntimeError(f"Invalid OAuth response format: {str(e)}") from e
+        finally:
+            # Only clear our own task; another loop may have started its own since
+            if self._inflight is task:
+                self._inflight = None
+
+        self._log_refresh(token)
+        return token
+
+    async def _get_async_client(self) -> httpx.AsyncClient:
+        """
+        Return the async HTTP client for the running event loop.
+
+        httpx connection pools are bound to the loop they were first used on,
+        so a client created under a previous loop is replaced rather than reused,
+        and the replaced client is closed so its pool doesn't leak.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            stale = self._async_client
+            # Limits must go on the transport: AsyncClient ignores its own limits when given one
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0, connect=3.0),
+                transport=httpx.AsyncHTTPTransport(retries=2, limits=httpx.Limits(max_connections=4))
+            )
+            self._async_client_loop = loop
+            if stale is not None:
+                await self._close_stale_client(stale)
+        return self._async_client
+
+    @staticmethod
+    async def _close_stale_client(client: httpx.AsyncClient) -> None:
+        """
+        Close a client left over from a previous event loop.
+
+        If that loop has already been closed (e.g. after asyncio.run returns),
+        its socket transports can't schedule their shutdown and raise
+        RuntimeError. The client is still marked closed and dropped, so its sockets
+        are released once the connections are garbage-collected.
+        """
+        try:
+            await client.aclose()
+        except RuntimeError as e:
+            print(f"[TokenManager] Warning: could not cleanly close previous async client: {e}")
+
+    async def aclose(self) -> None:
+        """
+        Close the async HTTP client, if one was created.
+
+        Call from the event loop that used get_token_async (e.g. an app
+        shutdown hook). The client is recreated on the next async refresh.
+        """
+        client = self._async_client
+        self._async_client = None
+        self._async_client_loop = None
+        if client is not None:
+            await client.aclose()
 
     def _is_token_expired(self) -> bool:
         """
@@ -95,79 +269,81 @@ class TokenManager:
         Returns:
             True if token needs refresh, False if still valid
         """
-        if not self._cached_token:
-            return True
-
-        # Calculate refresh time (expires_at - buffer)
-        refresh_time = self._cached_token.expires_at - self.REFRESH_BUFFER_SECONDS
-        current_time = time.time()
+        # Monotonic clock so wall-clock jumps can't trigger spurious refreshes
+        return self._cached_token is None or _monotonic() >= self._cached_token.refresh_deadline
 
-        return current_time >= refresh_time
-
-    def _fetch_and_cache_token(self) -> None:
+    def _fetch_and_cache_token(self) -> TokenData:
         """
         Fetch new token from Okta and cache it.
 
         Makes OAuth request to token endpoint and caches the result
-        with calculated expiration time.
+        with calculated expiration time. Must be called with the lock held.
+
+        Returns:
+            The newly cached TokenData
 
         Raises:
             RuntimeError: If OAuth request fails or returns invalid response
         """
         try:
-            # Prepare OAuth request
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-
-            data = {
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "grant_type": "client_credentials",
-                "scope": "versa.web versa.chat versa.assistant"
-            }
-
             # Make OAuth request
-            response = requests.post(
+            response = self._session.post(
                 self.token_url,
-                headers=headers,
-                data=data,
-                timeout=10  # 10 second timeout
+                headers=self._headers,
+                data=self._encoded_body,
+                timeout=(3, 10)  # 3 second connect, 10 second read timeout
             )
 
             # Check for HTTP errors
             response.raise_for_status()
 
             # Parse response
-            token_response = response.json()
-
-            # Extract access token
-            access_token = token_response.get("access_token")
-            if not access_token:
-                raise RuntimeError(
-                    f"OAuth response missing 'access_token' field. "
-                    f"Response: {token_response}"
-                )
-
-            # Extract expiration time (default to 3600 seconds = 1 hour)
-            expires_in = token_response.get("expires_in", 3600)
-            expires_at = time.time() + expires_in
-
-            # Cache token
-            self._cached_token = TokenData(
-                access_token=access_token,
-                expires_at=expires_at
-            )
-
-            # Log success (without exposing token)
-            expiry_time = datetime.fromtimestamp(expires_at).strftime('%Y-%m-%d %H:%M:%S')
-            print(f"[TokenManager] Successfully fetched new OAuth token (expires at {expiry_time})")
+            return self._cache_token_response(response.json())
 
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"OAuth token request failed: {str(e)}") from e
         except (KeyError, ValueError) as e:
             raise RuntimeError(f"Invalid OAuth response format: {str(e)}") from e
 
+    def _cache_token_response(self, token_response: Dict[str, Any]) -> TokenData:
+        """
+        Build TokenData from a parsed OAuth response and publish it to the cache.
+
+        Args:
+            token_response: Decoded JSON body of the token endpoint response
+
+        Returns:
+            The newly cached TokenData
+
+        Raises:
+            RuntimeError: If the response has no access token
+        """
+        # Extract access token
+        access_token = token_response.get("access_token")
+        if not access_token:
+            raise RuntimeError(
+                f"OAuth response missing 'access_token' field. "
+                f"Response: {token_response}"
+            )
+
+        # Extract expiration time (default to 3600 seconds = 1 hour)
+        expires_in = token_response.get("expires_in", 3600)
+        expires_at = time.time() + expires_in
+
+        # Cache token with its refresh deadline (expiry minus buffer) precomputed
+        self._cached_token = TokenData(
+            access_token=access_token,
+            expires_at=expires_at,
+            refresh_deadline=_monotonic() + expires_in - self.REFRESH_BUFFER_SECONDS
+        )
+        return self._cached_token
+
+    @staticmethod
+    def _log_refresh(token: TokenData) -> None:
+        """Log a successful refresh (without exposing token)"""
+        expiry_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(token.expires_at))
+        print(f"[TokenManager] Successfully fetched new OAuth token (expires at {expiry_time})")
+
     def clear_cache(self) -> None:
         """
         Clear cached token (useful for testing or forcing refresh).
@@ -179,10 +355,16 @@ class TokenManager:
             print("[TokenManager] Token cache cleared")
 
 
+@functools.lru_cache(maxsize=1)
 def create_token_manager_from_env() -> Optional[TokenManager]:
     """
     Factory function to create TokenManager from environment variables.
 
+    The result is memoized so every caller shares one TokenManager (and its
+    token cache and connection pool) for the process lifetime. Call
+    create_token_manager_from_env.cache_clear() after changing the
+    environment variables to pick up the new values.
+
     Returns:
         TokenManager instance if OAuth credentials are configured,
         None if credentials are not available (for backward compatibility)